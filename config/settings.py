@@ -55,12 +55,15 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.FarmerLanguageMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
 
+# No 'loaders' option on purpose: Django then wraps the default loaders in the
+# cached loader, so each template (e.g. the PDF report) is compiled only once
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -94,6 +97,30 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Defaults to per-process memory; point at Redis/Memcached in production.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Per-farmer dashboard data is cleared by signals in whichever worker saved
+# the change, so it is only cached in a backend every worker shares. With a
+# per-process cache it's switched off rather than serving stale dashboards.
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+if CACHES['default']['BACKEND'] in PER_PROCESS_CACHES:
+    CACHES['dashboard'] = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+else:
+    CACHES['dashboard'] = CACHES['default']
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -141,6 +168,9 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
@@ -149,6 +179,10 @@ STORAGES = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Files that must only be served through views that check who is asking
+# (e.g. bank reports). Keep this outside MEDIA_ROOT and never serve it directly.
+PRIVATE_MEDIA_ROOT = os.getenv('PRIVATE_MEDIA_ROOT', os.path.join(BASE_DIR, 'private_media'))
+
 # PWA Settings
 PWA_APP_NAME = 'AgriMate'
 PWA_APP_DESCRIPTION = "AgriMate — Smart Farming Companion"
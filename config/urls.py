@@ -19,11 +19,14 @@ urlpatterns = [
     path('add-expense/', views.expense_add, name='add_expense'),
     path('harvest/<int:cycle_id>/', views.crop_harvest, name='harvest_crop'),
     path('generate-report/', views.generate_pdf, name='generate_pdf'),
+    path('reports/<str:task_id>/download/', views.download_report, name='download_report'),
     path('switch-language/', views.switch_language, name='switch_language'),
     
     # API Endpoints (AJAX)
     path('api/mandi-prices/', views.api_mandi_prices, name='api_mandi_prices'),
     path('api/crop-forecast/', views.api_crop_forecast, name='api_crop_forecast'),
+    path('api/scheme-status/', views.api_scheme_status, name='api_scheme_status'),
+    path('api/report-status/<str:task_id>/', views.api_report_status, name='api_report_status'),
     
     path('', include('pwa.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
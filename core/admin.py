@@ -13,10 +13,16 @@ class CropAdmin(admin.ModelAdmin):
 admin.site.register(Expense)
 admin.site.register(Yield)
 
+class FarmerListFilter(admin.RelatedFieldListFilter):
+    """Farmer filter that loads each farmer's user in the same query (used by __str__)."""
+    def field_choices(self, field, request, model_admin):
+        farmers = FarmerProfile.objects.select_related('user').order_by('user__username')
+        return [(farmer.pk, str(farmer)) for farmer in farmers]
+
 @admin.register(SchemeRecommendation)
 class SchemeRecommendationAdmin(admin.ModelAdmin):
     list_display = ('scheme_name', 'farmer', 'created_at', 'is_active')
-    list_filter = ('is_active', 'created_at', 'farmer')
+    list_filter = ('is_active', 'created_at', ('farmer', FarmerListFilter))
     search_fields = ('scheme_name', 'description')
     date_hierarchy = 'created_at'
 
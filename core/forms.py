@@ -26,8 +26,13 @@ class ExpenseForm(forms.ModelForm):
     def __init__(self, user, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # FILTER LOGIC: Only show THIS farmer's active crops in the dropdown
+        # (filtered on the profile directly to skip the user join; the
+        # columns are what the choice label needs, plus farmer for the
+        # dashboard-invalidation signal when the expense is saved)
         if hasattr(user, 'farmerprofile'):
-            self.fields['cycle'].queryset = CropCycle.objects.filter(farmer__user=user, status='ACTIVE')
+            self.fields['cycle'].queryset = CropCycle.objects.filter(
+                farmer=user.farmerprofile, status='ACTIVE'
+            ).only('id', 'crop_name', 'status', 'farmer')
 
 class YieldForm(forms.ModelForm):
     class Meta:
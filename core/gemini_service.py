@@ -1,8 +1,14 @@
 import google.generativeai as genai
+from google.api_core import retry as api_retry
 import typing_extensions as typing
 import os
 import json
+import hashlib
 from django.conf import settings
+from django.core.cache import cache
+
+# Scheme suggestions rarely change within a day
+SCHEME_CACHE_TIMEOUT = 60 * 60 * 24
 
 # Configure API Key
 def configure_gemini():
@@ -12,6 +18,27 @@ def configure_gemini():
         genai.configure(api_key=api_key)
     return bool(api_key)
 
+# Fixed instructions, sent as the model's system instruction rather than
+# being rebuilt into every prompt
+SCHEME_INSTRUCTION = """
+Act as a government agricultural officer.
+Review the farmer's profile and the crop they just planted.
+Return a list of 3-5 relevant government schemes (Central or State) that they can apply for RIGHT NOW.
+Provide schemes with complete details including official application links.
+Focus on schemes that are currently active and accepting applications.
+"""
+
+# Shared model, created on first use so the key is only configured once
+_MODEL = None
+
+def get_model():
+    """Return the shared Gemini model, or None if no API key is configured."""
+    global _MODEL
+    if _MODEL is None and configure_gemini():
+        # Use the Flash model for speed, or Pro for complex reasoning
+        _MODEL = genai.GenerativeModel('gemini-1.5-flash', system_instruction=SCHEME_INSTRUCTION)
+    return _MODEL
+
 # 1. Define the exact structure you want back
 class Scheme(typing.TypedDict):
     scheme_name: str
@@ -24,6 +51,22 @@ class Scheme(typing.TypedDict):
 class SchemeList(typing.TypedDict):
     recommendations: list[Scheme]
 
+# Built once; the SchemeList schema doesn't change between calls
+SCHEME_GENERATION_CONFIG = genai.GenerationConfig(
+    response_mime_type="application/json",
+    response_schema=SchemeList
+)
+
+# The client keeps one connection open for all calls; this retries brief
+# outages/rate limits on it (with backoff) and stops a hung call from
+# holding the background thread forever
+SCHEME_REQUEST_OPTIONS = {
+    'retry': api_retry.Retry(
+        predicate=api_retry.if_transient_error, initial=0.3, multiplier=2, maximum=5, timeout=60
+    ),
+    'timeout': 30,
+}
+
 def fetch_schemes_smartly(farmer_profile, current_crop):
     """
     Uses Gemini's Structured Output to get guaranteed JSON.
@@ -35,21 +78,21 @@ def fetch_schemes_smartly(farmer_profile, current_crop):
     Returns:
         dict: Structured response with 'recommendations' key containing list of schemes
     """
+    # Farmers with the same profile and crop get the same schemes
+    cache_key = _scheme_cache_key(farmer_profile, current_crop)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     # Check if API is configured
-    if not configure_gemini():
+    model = get_model()
+    if model is None:
         print("Warning: Gemini API key not configured. Skipping scheme recommendations.")
         return {"recommendations": []}
     
     try:
-        # Use the Flash model for speed, or Pro for complex reasoning
-        model = genai.GenerativeModel('gemini-1.5-flash') 
-
-        # 3. Construct the context prompt
+        # 3. Construct the context prompt (only the farmer-specific part)
         prompt = f"""
-        Act as a government agricultural officer. 
-        Review this farmer's profile and the crop they just planted.
-        Return a list of 3-5 relevant government schemes (Central or State) that they can apply for RIGHT NOW.
-        
         FARMER DATA:
         - State: {farmer_profile.state or 'Not specified'}
         - District: {farmer_profile.district or 'Not specified'}
@@ -61,28 +104,38 @@ def fetch_schemes_smartly(farmer_profile, current_crop):
         - Crop: {current_crop.crop_name}
         - Season Date: {current_crop.start_date}
         - Area: {current_crop.area_used} acres
-        
-        Provide schemes with complete details including official application links.
-        Focus on schemes that are currently active and accepting applications.
         """
 
         # 4. The Magic Part: Force the response to follow the SchemeList structure
         response = model.generate_content(
-            prompt,
-            generation_config=genai.GenerationConfig(
-                response_mime_type="application/json",
-                response_schema=SchemeList
-            )
+            prompt, generation_config=SCHEME_GENERATION_CONFIG, request_options=SCHEME_REQUEST_OPTIONS
         )
 
         # 5. No more string replacement! It's already valid JSON.
         try:
-            return json.loads(response.text)
+            result = json.loads(response.text)
         except json.JSONDecodeError as e:
             print(f"JSON Parsing Error: {e}")
             print(f"Response text: {response.text}")
             return {"recommendations": []}
+        
+        cache.set(cache_key, result, SCHEME_CACHE_TIMEOUT)
+        return result
             
     except Exception as e:
         print(f"Gemini API Error: {e}")
         return {"recommendations": []}
+
+
+def _scheme_cache_key(farmer_profile, current_crop):
+    """Build a cache key from the profile fields that shape the prompt (land in 5-acre buckets)."""
+    land_bucket = int(farmer_profile.total_land_area // 5)
+    raw = "|".join([
+        farmer_profile.state.strip().lower(),
+        farmer_profile.district.strip().lower(),
+        farmer_profile.category,
+        current_crop.crop_name.strip().lower(),
+        str(farmer_profile.has_kcc),
+        str(land_bucket),
+    ])
+    return "schemes:" + hashlib.md5(raw.encode()).hexdigest()
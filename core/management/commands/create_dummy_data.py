@@ -1,19 +1,20 @@
 from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from core.models import FarmerProfile, CropCycle, Expense, Yield
+from django.db import transaction
+from core.models import FarmerProfile, CropCycle, Expense, Yield, generate_farmer_code
 from datetime import datetime, timedelta
 from decimal import Decimal
 import random
 
+BATCH_SIZE = 1000
+
 class Command(BaseCommand):
     help = 'Generate dummy farmers with historical data for demo purposes'
 
     def handle(self, *args, **kwargs):
         self.stdout.write('Creating dummy farmers...')
         
-        # Clear existing dummy data (optional)
-        User.objects.filter(username__startswith='demo').delete()
-        
         # Farmer templates with different experience levels
         farmers = [
             {'name': 'Ram Singh', 'phone': 'demo9876543210', 'land': 25.5, 'years': 5},
@@ -39,82 +40,126 @@ class Command(BaseCommand):
             ('Equipment Rental', 3000, 10000),
         ]
         
-        for farmer_data in farmers:
-            # Create user
-            user = User.objects.create_user(
-                username=farmer_data['phone'],
-                password='demo123',
-                first_name=farmer_data['name']
-            )
-            
-            # Create farmer profile
-            farmer = FarmerProfile.objects.create(
-                user=user,
-                total_land_area=Decimal(str(farmer_data['land']))
-            )
+        # All rows go in with bulk_create inside one transaction
+        with transaction.atomic():
+            # Clear existing dummy data (optional)
+            User.objects.filter(username__startswith='demo').delete()
             
-            self.stdout.write(f'  Created farmer: {farmer_data["name"]} ({farmer.farmer_code})')
+            # Create users (hash the shared demo password once)
+            password = make_password('demo123')
+            User.objects.bulk_create([
+                User(username=f['phone'], password=password, first_name=f['name'])
+                for f in farmers
+            ], batch_size=BATCH_SIZE)
+            users = User.objects.in_bulk([f['phone'] for f in farmers], field_name='username')
             
-            # Calculate how many months of history to generate
-            months_history = int(farmer_data['years'] * 12)
+            # Create farmer profiles (bulk_create skips save(), so set the code here)
+            FarmerProfile.objects.bulk_create([
+                FarmerProfile(
+                    user=users[f['phone']],
+                    farmer_code=generate_farmer_code(),
+                    total_land_area=Decimal(str(f['land']))
+                )
+                for f in farmers
+            ], batch_size=BATCH_SIZE)
+            profiles = {
+                profile.user_id: profile
+                for profile in FarmerProfile.objects.filter(user__in=users.values())
+            }
             
-            # Generate crops over time
+            # Generate crops for every farmer, keeping each crop's expenses and yield alongside it
             current_date = datetime.now()
-            crops_created = 0
+            cycles = []
             
-            for month_offset in range(0, months_history, 3):  # One crop every 3 months
-                # Calculate start date
-                start_date = current_date - timedelta(days=30 * month_offset)
+            for farmer_data in farmers:
+                farmer = profiles[users[farmer_data['phone']].pk]
+                self.stdout.write(f'  Created farmer: {farmer_data["name"]} ({farmer.farmer_code})')
                 
-                # Random crop
-                crop_name = random.choice(crops)
-                area = round(random.uniform(2.0, min(8.0, farmer_data['land'] / 2)), 2)
+                # Calculate how many months of history to generate
+                months_history = int(farmer_data['years'] * 12)
+                month_offsets = range(0, months_history, 3)  # One crop every 3 months
+                crops_created = 0
                 
-                # 70% of crops are harvested, 30% are still active
-                is_active = month_offset < 6 and random.random() < 0.3
-                status = 'ACTIVE' if is_active else 'HARVESTED'
+                # Draw every crop for this farmer in one call
+                crop_names = random.choices(crops, k=len(month_offsets))
                 
-                crop = CropCycle.objects.create(
-                    farmer=farmer,
-                    crop_name=crop_name,
-                    area_used=Decimal(str(area)),
-                    start_date=start_date.date(),
-                    status=status
-                )
-                crops_created += 1
-                
-                # Add expenses for this crop
-                num_expenses = random.randint(3, 8)
-                total_expense = 0
-                
-                for i in range(num_expenses):
-                    expense_name, min_cost, max_cost = random.choice(expense_types)
-                    cost = round(random.uniform(min_cost, max_cost), 2)
-                    expense_date = start_date + timedelta(days=random.randint(0, 60))
+                for month_offset, crop_name in zip(month_offsets, crop_names):
+                    # Calculate start date
+                    start_date = current_date - timedelta(days=30 * month_offset)
                     
-                    Expense.objects.create(
-                        cycle=crop,
-                        item_name=expense_name,
-                        cost=Decimal(str(cost)),
-                        date=expense_date.date()
-                    )
-                    total_expense += cost
-                
-                # If harvested, add yield data
-                if status == 'HARVESTED':
-                    # Revenue is typically 1.5x to 3x of expenses for profit
-                    revenue_multiplier = random.uniform(1.3, 2.8)
-                    selling_price = round(total_expense * revenue_multiplier, 2)
-                    harvest_date = start_date + timedelta(days=random.randint(90, 120))
+                    area = round(random.uniform(2.0, min(8.0, farmer_data['land'] / 2)), 2)
                     
-                    Yield.objects.create(
-                        cycle=crop,
-                        quantity_produced=Decimal(str(round(area * random.uniform(100, 500), 2))),
-                        selling_price=Decimal(str(selling_price)),
-                        date_sold=harvest_date.date()
+                    # 70% of crops are harvested, 30% are still active
+                    is_active = month_offset < 6 and random.random() < 0.3
+                    status = 'ACTIVE' if is_active else 'HARVESTED'
+                    
+                    crop = CropCycle(
+                        farmer=farmer,
+                        crop_name=crop_name,
+                        area_used=Decimal(str(area)),
+                        start_date=start_date.date(),
+                        status=status
                     )
+                    crops_created += 1
+                    if is_active:
+                        farmer.used_land_area += crop.area_used
+                    
+                    # Add expenses for this crop
+                    num_expenses = random.randint(3, 8)
+                    total_expense = 0
+                    crop_expenses = []
+                    
+                    for expense_name, min_cost, max_cost in random.choices(expense_types, k=num_expenses):
+                        cost = round(random.uniform(min_cost, max_cost), 2)
+                        expense_date = start_date + timedelta(days=random.randint(0, 60))
+                        
+                        crop_expenses.append({
+                            'item_name': expense_name,
+                            'cost': Decimal(str(cost)),
+                            'date': expense_date.date()
+                        })
+                        total_expense += cost
+                    
+                    # If harvested, add yield data
+                    crop_yield = None
+                    if status == 'HARVESTED':
+                        # Revenue is typically 1.5x to 3x of expenses for profit
+                        revenue_multiplier = random.uniform(1.3, 2.8)
+                        selling_price = round(total_expense * revenue_multiplier, 2)
+                        harvest_date = start_date + timedelta(days=random.randint(90, 120))
+                        
+                        crop_yield = {
+                            'quantity_produced': Decimal(str(round(area * random.uniform(100, 500), 2))),
+                            'selling_price': Decimal(str(selling_price)),
+                            'date_sold': harvest_date.date()
+                        }
+                    
+                    cycles.append((crop, crop_expenses, crop_yield))
+                
+                self.stdout.write(f'    > Created {crops_created} crops with expenses and yields')
+            
+            CropCycle.objects.bulk_create([crop for crop, _, _ in cycles], batch_size=BATCH_SIZE)
+            # bulk_create skips the signal that keeps used land in sync
+            FarmerProfile.objects.bulk_update(profiles.values(), ['used_land_area'], batch_size=BATCH_SIZE)
+            
+            # MySQL doesn't return ids from bulk inserts; each farmer's crops have distinct start dates
+            cycle_ids = {
+                (farmer_id, start_date): pk
+                for pk, farmer_id, start_date in CropCycle.objects.filter(
+                    farmer__in=profiles.values()
+                ).values_list('pk', 'farmer_id', 'start_date')
+            }
+            
+            expenses = []
+            yields = []
+            for crop, crop_expenses, crop_yield in cycles:
+                crop.pk = cycle_ids[(crop.farmer_id, crop.start_date)]
+                expenses.extend(Expense(cycle=crop, **expense) for expense in crop_expenses)
+                if crop_yield:
+                    yields.append(Yield(cycle=crop, **crop_yield))
             
-            self.stdout.write(f'    > Created {crops_created} crops with expenses and yields')
+            Expense.objects.bulk_create(expenses, batch_size=BATCH_SIZE)
+            Yield.objects.bulk_create(yields, batch_size=BATCH_SIZE)
         
         self.stdout.write(self.style.SUCCESS(f'\nSuccessfully created {len(farmers)} dummy farmers!'))
         self.stdout.write('Login credentials:')
@@ -6,17 +6,78 @@ Provides:
 """
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from decimal import Decimal
-from django.db.models import Avg, Sum, F
-from .models import CropCycle, Expense, Yield
+from types import MappingProxyType
+from django.core.cache import cache
+from django.db.models import Avg, Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from .models import CropCycle, Expense
+
+
+def _freeze(table):
+    """Wrap a lookup table (and its rows) in read-only views."""
+    return MappingProxyType({key: MappingProxyType(row) for key, row in table.items()})
+
+
+# Common local/alternate names mapped to the keys used in the tables below
+CROP_ALIASES = MappingProxyType({
+    'corn': 'maize',
+    'makka': 'maize',
+    'makki': 'maize',
+    'gehun': 'wheat',
+    'gehu': 'wheat',
+    'chawal': 'rice',
+    'dhan': 'paddy',
+    'kapas': 'cotton',
+    'ganna': 'sugarcane',
+    'soya': 'soybean',
+    'soyabean': 'soybean',
+    'sarson': 'mustard',
+    'rapeseed': 'mustard',
+    'moongphali': 'groundnut',
+    'peanut': 'groundnut',
+    'pyaz': 'onion',
+    'pyaaz': 'onion',
+    'aloo': 'potato',
+    'tamatar': 'tomato',
+    'gram': 'chana',
+    'chickpea': 'chana',
+    'arhar': 'tur',
+    'toor': 'tur',
+    'pigeon pea': 'tur',
+    'sorghum': 'jowar',
+    'pearl millet': 'bajra',
+    'bajri': 'bajra',
+    'finger millet': 'ragi',
+    'nachni': 'ragi',
+    'jau': 'barley',
+})
+
+
+def _normalize_crop(crop_name):
+    """Lower-case a crop name and resolve known aliases (e.g. 'Corn' -> 'maize')."""
+    crop_lower = crop_name.strip().lower()
+    return CROP_ALIASES.get(crop_lower, crop_lower)
 
 
 # ============================================================
 # 1. MANDI PRICE SERVICE
 # ============================================================
 
+# Shared session so repeat calls to data.gov.in reuse the TCP/TLS connection
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=10))
+
+# Mandi rates are published once a day
+MANDI_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Parallel lookups in fetch_mandi_prices_bulk (stays within the session pool)
+MANDI_MAX_WORKERS = 8
+
 # Fallback average prices (₹ per quintal) when API is unavailable
-FALLBACK_MANDI_PRICES = {
+FALLBACK_MANDI_PRICES = _freeze({
     'wheat': {'min': 2100, 'max': 2400, 'modal': 2275, 'unit': 'Quintal'},
     'rice': {'min': 2200, 'max': 2800, 'modal': 2500, 'unit': 'Quintal'},
     'paddy': {'min': 2000, 'max': 2600, 'modal': 2300, 'unit': 'Quintal'},
@@ -35,7 +96,18 @@ FALLBACK_MANDI_PRICES = {
     'bajra': {'min': 2200, 'max': 2700, 'modal': 2500, 'unit': 'Quintal'},
     'ragi': {'min': 3300, 'max': 3800, 'modal': 3578, 'unit': 'Quintal'},
     'barley': {'min': 1600, 'max': 2000, 'modal': 1735, 'unit': 'Quintal'},
-}
+})
+
+
+def _mandi_cache_key(crop_name, district='', state=''):
+    return f"mandi:{crop_name.strip().lower()}:{district.strip().lower()}:{state.strip().lower()}".replace(' ', '_')
+
+
+def uncached_mandi_crops(crop_names, district='', state=''):
+    """Return the crops (in order, de-duplicated) whose mandi prices aren't cached yet."""
+    keys = {crop: _mandi_cache_key(crop, district, state) for crop in dict.fromkeys(crop_names)}
+    cached = cache.get_many(keys.values())
+    return [crop for crop, key in keys.items() if key not in cached]
 
 
 def fetch_mandi_prices(crop_name, district='', state=''):
@@ -49,11 +121,13 @@ def fetch_mandi_prices(crop_name, district='', state=''):
     Returns:
         dict with keys: crop, district, prices (list of market entries), source
     """
-    crop_lower = crop_name.strip().lower()
-    
-    # 1. Try data.gov.in API
+    # 1. Try data.gov.in API (cached per crop + location)
+    cache_key = _mandi_cache_key(crop_name, district, state)
     try:
-        api_data = _fetch_from_data_gov(crop_name, district, state)
+        api_data = cache.get(cache_key)
+        if api_data is None:
+            api_data = _fetch_from_data_gov(crop_name, district, state)
+            cache.set(cache_key, api_data, MANDI_CACHE_TIMEOUT)
         if api_data and len(api_data) > 0:
             return {
                 'crop': crop_name,
@@ -66,8 +140,8 @@ def fetch_mandi_prices(crop_name, district='', state=''):
         print(f"data.gov.in API error: {e}")
     
     # 2. Fallback to curated data
-    if crop_lower in FALLBACK_MANDI_PRICES:
-        price_data = FALLBACK_MANDI_PRICES[crop_lower]
+    price_data = FALLBACK_MANDI_PRICES.get(_normalize_crop(crop_name))
+    if price_data:
         return {
             'crop': crop_name,
             'district': district or 'All India',
@@ -92,6 +166,25 @@ def fetch_mandi_prices(crop_name, district='', state=''):
     }
 
 
+def fetch_mandi_prices_bulk(crop_names, district='', state=''):
+    """
+    Fetch mandi prices for several crops at once.
+    
+    Lookups run in parallel threads, so the total wait is roughly the
+    slowest single call instead of the sum of all of them.
+    
+    Returns:
+        dict mapping each crop name to its fetch_mandi_prices() result
+    """
+    crop_names = list(dict.fromkeys(crop_names))  # de-duplicate, keep order
+    if not crop_names:
+        return {}
+    
+    with ThreadPoolExecutor(max_workers=min(len(crop_names), MANDI_MAX_WORKERS)) as pool:
+        results = pool.map(lambda crop: fetch_mandi_prices(crop, district, state), crop_names)
+        return dict(zip(crop_names, results))
+
+
 def _fetch_from_data_gov(crop_name, district='', state=''):
     """
     Query data.gov.in for daily mandi prices.
@@ -112,33 +205,36 @@ def _fetch_from_data_gov(crop_name, district='', state=''):
     if state:
         params['filters[state]'] = state.strip().title()
     
-    response = requests.get(API_URL, params=params, timeout=5)
+    response = _SESSION.get(API_URL, params=params, timeout=5)
+    # Raise on HTTP errors so a temporary outage isn't cached as "no data"
+    response.raise_for_status()
     
-    if response.status_code == 200:
-        data = response.json()
-        records = data.get('records', [])
-        
-        results = []
-        for record in records:
-            results.append({
-                'market': record.get('market', 'Unknown'),
-                'min_price': int(record.get('min_price', 0)),
-                'max_price': int(record.get('max_price', 0)),
-                'modal_price': int(record.get('modal_price', 0)),
-                'unit': 'Quintal',
-                'state': record.get('state', ''),
-                'arrival_date': record.get('arrival_date', ''),
-            })
-        
-        return results
+    data = response.json()
+    records = data.get('records', [])
+    
+    results = []
+    for record in records:
+        results.append({
+            'market': record.get('market', 'Unknown'),
+            'min_price': int(record.get('min_price', 0)),
+            'max_price': int(record.get('max_price', 0)),
+            'modal_price': int(record.get('modal_price', 0)),
+            'unit': 'Quintal',
+            'state': record.get('state', ''),
+            'arrival_date': record.get('arrival_date', ''),
+        })
     
-    return []
+    return results
 
 
 # ============================================================
 # 2. PROFITABILITY FORECASTER
 # ============================================================
 
+# Historical totals per crop are reused for this long
+FORECAST_CACHE_TIMEOUT = 60 * 30
+
+
 def get_crop_forecast(crop_name, area_acres=1):
     """
     Predict profitability for a crop based on historical data.
@@ -163,33 +259,36 @@ def get_crop_forecast(crop_name, area_acres=1):
         status='HARVESTED'
     )
     
-    cycle_count = completed_cycles.count()
+    # Let the DB do all the sums in one query. Each cycle's expenses are
+    # totalled in a subquery so joining them can't repeat area/income rows.
+    # History only changes on harvest, so the totals are cached per crop.
+    def load_totals():
+        zero = Value(Decimal('0'), output_field=DecimalField())
+        cycle_expenses = Expense.objects.filter(cycle=OuterRef('pk')).values('cycle').annotate(
+            total=Sum('cost')
+        ).values('total')
+        return completed_cycles.annotate(
+            expenses=Coalesce(Subquery(cycle_expenses), zero)
+        ).aggregate(
+            cycle_count=Count('id'),
+            cycles_with_yield=Count('yield'),
+            total_expenses=Coalesce(Sum('expenses'), zero),
+            total_income=Coalesce(Sum('yield__selling_price'), zero),
+            total_area=Coalesce(Sum('area_used'), zero),
+        )
+
+    cache_key = f"forecast:{crop_lower}".replace(' ', '_')
+    totals = cache.get_or_set(cache_key, load_totals, FORECAST_CACHE_TIMEOUT)
+    cycle_count = totals['cycle_count']
     
     if cycle_count == 0:
         # No historical data — use curated estimates
         return _get_estimated_forecast(crop_lower, area_acres)
     
-    # Calculate averages from historical data
-    total_expenses = Decimal('0')
-    total_income = Decimal('0')
-    total_area = Decimal('0')
-    cycles_with_yield = 0
-    
-    for cycle in completed_cycles:
-        cycle_expenses = Expense.objects.filter(cycle=cycle).aggregate(
-            total=Sum('cost')
-        )['total'] or Decimal('0')
-        
-        try:
-            cycle_yield = Yield.objects.get(cycle=cycle)
-            cycle_income = cycle_yield.selling_price or Decimal('0')
-            cycles_with_yield += 1
-        except Yield.DoesNotExist:
-            cycle_income = Decimal('0')
-        
-        total_expenses += cycle_expenses
-        total_income += cycle_income
-        total_area += cycle.area_used
+    total_expenses = totals['total_expenses']
+    total_income = totals['total_income']
+    total_area = totals['total_area']
+    cycles_with_yield = totals['cycles_with_yield']
     
     if total_area == 0:
         return _get_estimated_forecast(crop_lower, area_acres)
@@ -225,7 +324,7 @@ def get_crop_forecast(crop_name, area_acres=1):
 
 
 # Curated cost/revenue estimates per acre (in ₹)
-CROP_ESTIMATES = {
+CROP_ESTIMATES = _freeze({
     'wheat':      {'expense': 12000, 'income': 28000},
     'rice':       {'expense': 15000, 'income': 32000},
     'paddy':      {'expense': 14000, 'income': 30000},
@@ -242,19 +341,19 @@ CROP_ESTIMATES = {
     'tur':        {'expense': 12000, 'income': 28000},
     'jowar':      {'expense': 8000,  'income': 18000},
     'bajra':      {'expense': 7000,  'income': 16000},
-}
+})
 
 
 def _get_estimated_forecast(crop_lower, area_acres):
     """Return curated estimates when no historical data exists."""
-    if crop_lower not in CROP_ESTIMATES:
+    est = CROP_ESTIMATES.get(_normalize_crop(crop_lower))
+    if est is None:
         return {
             'crop': crop_lower.title(),
             'found': False,
             'message': 'No historical or estimated data available for this crop.'
         }
     
-    est = CROP_ESTIMATES[crop_lower]
     area = float(area_acres)
     expense = est['expense']
     income = est['income']
@@ -0,0 +1,32 @@
+from django.utils import translation
+
+# Session key holding the farmer's chosen language
+LANGUAGE_SESSION_KEY = 'django_language'
+
+
+class FarmerLanguageMiddleware:
+    """
+    Activate the farmer's language from the session.
+
+    Django's LocaleMiddleware only looks at the URL, cookie and browser
+    headers, so this runs after it (and after auth) to apply the language
+    stored at login or by switch_language. Sessions from before the key was
+    set read it from the profile once.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        lang = request.session.get(LANGUAGE_SESSION_KEY)
+        if lang is None and request.user.is_authenticated:
+            farmer = getattr(request.user, 'farmerprofile', None)
+            if farmer is not None:
+                lang = farmer.language or 'en'
+                request.session[LANGUAGE_SESSION_KEY] = lang
+
+        if lang and lang != request.LANGUAGE_CODE:
+            translation.activate(lang)
+            request.LANGUAGE_CODE = lang
+
+        return self.get_response(request)
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-15 01:49
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_used_land_area(apps, schema_editor):
+    FarmerProfile = apps.get_model('core', 'FarmerProfile')
+    CropCycle = apps.get_model('core', 'CropCycle')
+    for farmer in FarmerProfile.objects.all():
+        used = CropCycle.objects.filter(farmer=farmer, status='ACTIVE').aggregate(
+            total=Sum('area_used')
+        )['total'] or 0
+        FarmerProfile.objects.filter(pk=farmer.pk).update(used_land_area=used)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_farmerprofile_language_alter_cropcycle_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='farmerprofile',
+            name='used_land_area',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=6),
+        ),
+        migrations.RunPython(backfill_used_land_area, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-15 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_farmerprofile_used_land_area'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cropcycle',
+            index=models.Index(fields=['farmer', 'status'], name='cropcycle_farmer_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cropcycle',
+            index=models.Index(fields=['crop_name', 'status'], name='cropcycle_crop_status_idx'),
+        ),
+    ]
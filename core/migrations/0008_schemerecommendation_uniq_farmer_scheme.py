@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-15 01:52
+
+from django.db import migrations, models
+
+
+def remove_duplicate_schemes(apps, schema_editor):
+    """Keep only the newest copy of each scheme per farmer so the constraint can be added."""
+    SchemeRecommendation = apps.get_model('core', 'SchemeRecommendation')
+    seen = set()
+    duplicate_ids = []
+    rows = SchemeRecommendation.objects.order_by('-created_at', '-pk').values_list('pk', 'farmer_id', 'scheme_name')
+    for pk, farmer_id, scheme_name in rows:
+        # Case/whitespace-insensitive, matching MySQL's default collation
+        key = (farmer_id, scheme_name.strip().lower())
+        if key in seen:
+            duplicate_ids.append(pk)
+        else:
+            seen.add(key)
+    SchemeRecommendation.objects.filter(pk__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_cropcycle_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_schemes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='schemerecommendation',
+            constraint=models.UniqueConstraint(fields=('farmer', 'scheme_name'), name='uniq_farmer_scheme'),
+        ),
+    ]
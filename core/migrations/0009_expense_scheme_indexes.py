@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-15 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_schemerecommendation_uniq_farmer_scheme'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['cycle', '-date'], name='expense_cycle_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schemerecommendation',
+            index=models.Index(fields=['farmer', 'is_active', '-created_at'], name='scheme_farmer_active_idx'),
+        ),
+    ]
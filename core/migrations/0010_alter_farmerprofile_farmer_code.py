@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-15 02:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_expense_scheme_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='farmerprofile',
+            name='farmer_code',
+            field=models.CharField(editable=False, max_length=12, unique=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-15 02:12
+
+import core.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_alter_farmerprofile_farmer_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.CharField(max_length=32, unique=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('file', models.FileField(blank=True, storage=core.models.private_storage, upload_to='reports/')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('farmer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='credit_report', to='core.farmerprofile')),
+            ],
+        ),
+    ]
@@ -1,7 +1,46 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-import uuid
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from io import BytesIO
+from PIL import Image, ImageOps
+import os
+import secrets
+
+
+def generate_farmer_code():
+    """Return a new public farmer ID like FMR-1A2B3C4D."""
+    # 8 random hex digits (4 billion codes), so signups don't collide on the unique column
+    return "FMR-" + secrets.token_hex(4).upper()
+
+def private_storage():
+    """Storage outside MEDIA_ROOT, for files only served by views that check access."""
+    return FileSystemStorage(location=settings.PRIVATE_MEDIA_ROOT)
+
+# Receipt photos are scaled down to fit this many pixels on the longest side
+RECEIPT_MAX_SIZE = 1600
+
+
+def compress_upload(field_file):
+    """Shrink a newly uploaded image to RECEIPT_MAX_SIZE and re-encode it as WebP."""
+    # Only fresh uploads; files already in storage were handled when they came in
+    if not field_file or field_file._committed:
+        return
+    try:
+        with Image.open(field_file) as img:
+            img = ImageOps.exif_transpose(img)  # keep phone photos the right way up
+            img.thumbnail((RECEIPT_MAX_SIZE, RECEIPT_MAX_SIZE))
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+            buffer = BytesIO()
+            img.save(buffer, format='WEBP', quality=80)
+    except (OSError, ValueError):
+        # Not something Pillow can re-encode; keep the original upload
+        return
+    name = os.path.splitext(os.path.basename(field_file.name))[0] + '.webp'
+    field_file.save(name, ContentFile(buffer.getvalue()), save=False)
 
 # 1. Farmer Profile: Stores the unique ID and Land info
 class FarmerProfile(models.Model):
@@ -19,7 +58,7 @@ class FarmerProfile(models.Model):
     ]
     
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    farmer_code = models.CharField(max_length=10, unique=True, editable=False)
+    farmer_code = models.CharField(max_length=12, unique=True, editable=False)
     total_land_area = models.DecimalField(max_digits=6, decimal_places=2)
     
     # Fields for scheme targeting
@@ -29,19 +68,21 @@ class FarmerProfile(models.Model):
     has_kcc = models.BooleanField(default=False, help_text="Has Kisan Credit Card")
     language = models.CharField(max_length=5, choices=LANGUAGE_CHOICES, default='en')
     
+    # Total area of ACTIVE crops, kept in sync by signals on CropCycle
+    used_land_area = models.DecimalField(max_digits=6, decimal_places=2, default=0, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
 
     def save(self, *args, **kwargs):
         if not self.farmer_code:
-            self.farmer_code = "FMR-" + str(uuid.uuid4())[:4].upper()
+            self.farmer_code = generate_farmer_code()
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user.username} ({self.farmer_code})"
 
     def get_free_land(self):
-        used = self.cropcycle_set.filter(status='ACTIVE').aggregate(models.Sum('area_used'))['area_used__sum'] or 0
-        return self.total_land_area - used
+        return self.total_land_area - self.used_land_area
 
 # 2. Crop Cycle: Manages active vs harvested land
 class CropCycle(models.Model):
@@ -57,19 +98,31 @@ class CropCycle(models.Model):
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Dashboard: a farmer's active crops
+            models.Index(fields=['farmer', 'status'], name='cropcycle_farmer_status_idx'),
+            # Forecast: harvested cycles of a crop
+            models.Index(fields=['crop_name', 'status'], name='cropcycle_crop_status_idx'),
+        ]
+
     def clean(self):
         # Skip validation if farmer not assigned yet (e.g., during form creation)
-        if not self.farmer_id:
+        # or the area already failed its own field validation.
+        # Only active crops take up land
+        if not self.farmer_id or self.area_used is None or self.status != 'ACTIVE':
             return
         
-        if self.status == 'ACTIVE':
-            used = self.farmer.cropcycle_set.filter(status='ACTIVE').exclude(pk=self.pk).aggregate(models.Sum('area_used'))['area_used__sum'] or 0
-            if (used + self.area_used) > self.farmer.total_land_area:
-                 raise ValidationError(f"Insufficient Land! Free space: {self.farmer.get_free_land()}")
-
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+        # used_land_area already counts this cycle if it was saved as active
+        # for this same farmer (not if it's being moved from another one)
+        used = self.farmer.used_land_area
+        if self.pk:
+            previous = CropCycle.objects.filter(
+                pk=self.pk, farmer_id=self.farmer_id, status='ACTIVE'
+            ).values_list('area_used', flat=True).first()
+            used -= previous or 0
+        if (used + self.area_used) > self.farmer.total_land_area:
+             raise ValidationError(f"Insufficient Land! Free space: {self.farmer.get_free_land()}")
 
     def __str__(self):
         return f"{self.crop_name} ({self.status})"
@@ -83,6 +136,16 @@ class Expense(models.Model):
     date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Dashboard / report: latest expenses of a farmer's cycles
+            models.Index(fields=['cycle', '-date'], name='expense_cycle_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        compress_upload(self.receipt_image)
+        super().save(*args, **kwargs)
+
 # 4. Yield: Tracks income
 class Yield(models.Model):
     cycle = models.OneToOneField(CropCycle, on_delete=models.CASCADE)
@@ -92,6 +155,10 @@ class Yield(models.Model):
     date_sold = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        compress_upload(self.sold_receipt)
+        super().save(*args, **kwargs)
+
 # 5. Scheme Recommendation: AI-generated government scheme suggestions
 class SchemeRecommendation(models.Model):
     farmer = models.ForeignKey(FarmerProfile, on_delete=models.CASCADE, related_name='scheme_recommendations')
@@ -105,6 +172,14 @@ class SchemeRecommendation(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Dashboard: a farmer's active schemes, newest first
+            models.Index(fields=['farmer', 'is_active', '-created_at'], name='scheme_farmer_active_idx'),
+        ]
+        constraints = [
+            # Lets repeat fetches insert with ignore_conflicts instead of duplicating
+            models.UniqueConstraint(fields=['farmer', 'scheme_name'], name='uniq_farmer_scheme'),
+        ]
     
     def __str__(self):
         return f"{self.scheme_name} - {self.farmer.farmer_code}"
@@ -115,3 +190,21 @@ class SchemeRecommendation(models.Model):
         from django.utils import timezone
         import datetime
         return self.created_at >= timezone.now() - datetime.timedelta(days=7)
+
+# 6. Credit Report: the farmer's latest bank report, built in the background
+class CreditReport(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('READY', 'Ready'),
+        ('FAILED', 'Failed'),
+    ]
+    # One row (and one stored PDF) per farmer; each new request replaces it
+    farmer = models.OneToOneField(FarmerProfile, on_delete=models.CASCADE, related_name='credit_report')
+    task_id = models.CharField(max_length=32, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    # Private: only reachable through download_report, which checks the owner
+    file = models.FileField(upload_to='reports/', storage=private_storage, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Credit report {self.farmer.farmer_code} ({self.status})"
@@ -0,0 +1,82 @@
+"""
+Bank credit report for a farmer: gathers the figures and renders the PDF.
+"""
+from django.db.models import Case, Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Least
+from django.template.loader import render_to_string
+from django.utils import timezone
+from .models import CropCycle, Expense, FarmerProfile, Yield
+
+
+def _farmer_subquery(queryset, farmer_field, aggregate, output_field):
+    """Correlated subquery returning `aggregate` over `queryset` for the outer farmer (0 if no rows)."""
+    value = queryset.values(farmer_field).annotate(value=aggregate).values('value')
+    return Coalesce(Subquery(value), Value(0), output_field=output_field)
+
+
+def build_report_context(farmer):
+    """Template context for the credit report of `farmer`."""
+    # Get data for the report
+    crops = list(
+        CropCycle.objects.filter(farmer=farmer).only('crop_name', 'area_used', 'start_date', 'status').order_by('-start_date')[:10]
+    )
+    expenses = Expense.objects.filter(cycle__farmer=farmer).only('item_name', 'cost', 'date').order_by('-date')[:10]
+
+    # Calculate financial summary and credit score in one query. Each figure
+    # is its own subquery so income and expense rows can't multiply each
+    # other in a join.
+    summary = FarmerProfile.objects.filter(pk=farmer.pk).annotate(
+        total_income=_farmer_subquery(
+            Yield.objects.filter(cycle__farmer=OuterRef('pk')), 'cycle__farmer', Sum('selling_price'), DecimalField()
+        ),
+        total_expenses=_farmer_subquery(
+            Expense.objects.filter(cycle__farmer=OuterRef('pk')), 'cycle__farmer', Sum('cost'), DecimalField()
+        ),
+        crop_count=_farmer_subquery(
+            CropCycle.objects.filter(farmer=OuterRef('pk')), 'farmer', Count('id'), IntegerField()
+        ),
+        active_crop_count=_farmer_subquery(
+            CropCycle.objects.filter(farmer=OuterRef('pk'), status='ACTIVE'), 'farmer', Count('id'), IntegerField()
+        ),
+    ).annotate(
+        # Simple credit score calculation (0-100)
+        # Based on: number of crops, profit, and activity
+        credit_score=Least(
+            Value(100),
+            Least(F('crop_count'), Value(10)) * 10  # 10 points per crop (max 100)
+            + Case(When(total_income__gt=F('total_expenses'), then=Value(20)), default=Value(0))  # 20 points for positive profit
+            + F('active_crop_count') * 5,  # 5 points per active crop
+            output_field=IntegerField(),
+        ),
+    ).values('total_income', 'total_expenses', 'active_crop_count', 'credit_score').get()
+
+    total_income = summary['total_income']
+    total_expenses = summary['total_expenses']
+    net_profit = total_income - total_expenses
+    active_crop_count = summary['active_crop_count']
+    credit_score = summary['credit_score']
+
+    return {
+        'farmer': farmer,
+        'crops': crops,
+        'expenses': expenses,
+        'total_income': total_income,
+        'total_expenses': total_expenses,
+        'net_profit': net_profit,
+        'active_crop_count': active_crop_count,
+        'credit_score': credit_score,
+        'report_date': timezone.now(),
+    }
+
+
+def render_report_pdf(farmer, target, base_url=None):
+    """Render the credit report for `farmer` as a PDF into the file object `target`.
+
+    `base_url` is the site root, used to resolve relative links in the template.
+    """
+    html_string = render_to_string('core/report_template.html', build_report_context(farmer))
+
+    # Generate PDF using WeasyPrint (imported here so the rest of the
+    # site still loads on hosts without its Pango/Cairo libraries)
+    from weasyprint import HTML
+    HTML(string=html_string, base_url=base_url).write_pdf(target=target)
@@ -0,0 +1,75 @@
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import caches
+from django.db.models import QuerySet, Sum
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .middleware import LANGUAGE_SESSION_KEY
+from .models import CreditReport, CropCycle, Expense, FarmerProfile, SchemeRecommendation, Yield
+
+# Dashboard lists are cached per farmer (in the 'dashboard' cache, see
+# settings.CACHES) and cleared by the receivers below
+DASHBOARD_CACHE_TIMEOUT = 60 * 5
+
+
+def dashboard_cache_key(farmer_id):
+    return f"dashboard:{farmer_id}"
+
+
+def invalidate_dashboard(farmer_id):
+    """Drop the farmer's cached dashboard data so the next visit reloads it."""
+    caches['dashboard'].delete(dashboard_cache_key(farmer_id))
+
+
+def deleted_by_cascade(instance, origin):
+    """True if `instance` is being deleted only because a parent row (e.g. its farmer) is."""
+    if origin is None:
+        return False
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is not type(instance)
+
+
+@receiver(post_save, sender=CropCycle)
+@receiver(post_delete, sender=CropCycle)
+def update_used_land_area(sender, instance, origin=None, **kwargs):
+    """Recalculate the farmer's used land whenever one of their crops changes."""
+    # When the farmer (or their user) is deleted, the profile is going too
+    if deleted_by_cascade(instance, origin):
+        return
+    used = CropCycle.objects.filter(farmer_id=instance.farmer_id, status='ACTIVE').aggregate(
+        total=Sum('area_used')
+    )['total'] or 0
+    FarmerProfile.objects.filter(pk=instance.farmer_id).update(used_land_area=used)
+    invalidate_dashboard(instance.farmer_id)
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+@receiver(post_save, sender=Yield)
+@receiver(post_delete, sender=Yield)
+def invalidate_dashboard_for_cycle(sender, instance, origin=None, **kwargs):
+    # Deleting the cycle (or farmer) clears the dashboard once on its own;
+    # skip it here so a cascade doesn't load the cycle for every row
+    if deleted_by_cascade(instance, origin):
+        return
+    invalidate_dashboard(instance.cycle.farmer_id)
+
+
+@receiver(post_save, sender=SchemeRecommendation)
+@receiver(post_delete, sender=SchemeRecommendation)
+def invalidate_dashboard_for_scheme(sender, instance, **kwargs):
+    invalidate_dashboard(instance.farmer_id)
+
+
+@receiver(post_delete, sender=CreditReport)
+def delete_credit_report_file(sender, instance, **kwargs):
+    """Remove the stored PDF along with its report (e.g. when the farmer is deleted)."""
+    if instance.file:
+        instance.file.delete(save=False)
+
+
+@receiver(user_logged_in)
+def store_farmer_language(sender, request, user, **kwargs):
+    """Remember the farmer's language in the session for FarmerLanguageMiddleware."""
+    farmer = getattr(user, 'farmerprofile', None)
+    if farmer is not None:
+        request.session[LANGUAGE_SESSION_KEY] = farmer.language or 'en'
@@ -0,0 +1,192 @@
+"""
+Background jobs for AgriMate.
+
+Slow work (like the Gemini scheme lookup) runs on a daemon thread once the
+current transaction commits, so the request can return right away.
+"""
+import datetime
+import tempfile
+import threading
+import uuid
+from django.core.cache import cache
+from django.core.files.base import File
+from django.db import connections, transaction
+from django.utils import timezone
+from .models import CreditReport, CropCycle, FarmerProfile, SchemeRecommendation
+from .gemini_service import fetch_schemes_smartly
+from .market_service import fetch_mandi_prices_bulk, uncached_mandi_crops
+from .report_service import render_report_pdf
+from .signals import invalidate_dashboard
+
+
+def run_in_background(func, *args):
+    """Run func(*args) on a daemon thread after the current transaction commits."""
+    def target():
+        try:
+            func(*args)
+        except Exception as e:
+            print(f"Background task {func.__name__} failed: {e}")
+        finally:
+            # Each thread gets its own DB connection; don't leak it
+            connections.close_all()
+
+    transaction.on_commit(lambda: threading.Thread(target=target, daemon=True).start())
+
+
+# How long the dashboard keeps showing "finding schemes" if a fetch never finishes
+SCHEMES_PENDING_TIMEOUT = 60 * 5
+
+
+def schemes_pending_key(farmer_id):
+    """Cache key that is set while a scheme fetch is running for the farmer."""
+    return f"schemes_pending:{farmer_id}"
+
+
+def queue_scheme_fetch(farmer_id, cycle_id):
+    """Mark schemes as pending for the dashboard and start the fetch in the background."""
+    cache.set(schemes_pending_key(farmer_id), True, SCHEMES_PENDING_TIMEOUT)
+    run_in_background(fetch_schemes_task, farmer_id, cycle_id)
+
+
+def fetch_schemes_task(farmer_id, cycle_id):
+    """Fetch government schemes for a new crop and store them for the farmer."""
+    try:
+        _store_schemes(farmer_id, cycle_id)
+    finally:
+        cache.delete(schemes_pending_key(farmer_id))
+
+
+def _store_schemes(farmer_id, cycle_id):
+    crop = CropCycle.objects.select_related('farmer').get(pk=cycle_id, farmer_id=farmer_id)
+
+    # 1. Fetch clean data using structured schema
+    data = fetch_schemes_smartly(crop.farmer, crop)
+
+    # 2. Bulk Create (Much faster than looping and saving one by one)
+    schemes_to_create = []
+
+    # bulk_create skips field validation, so clip the AI's text to the column
+    # sizes here; one overlong value would otherwise fail the whole insert
+    name_length = SchemeRecommendation._meta.get_field('scheme_name').max_length
+    link_length = SchemeRecommendation._meta.get_field('link').max_length
+
+    for item in data.get('recommendations', []):
+        link = item.get('application_link', '')
+        schemes_to_create.append(
+            SchemeRecommendation(
+                farmer=crop.farmer,
+                scheme_name=item.get('scheme_name', 'Unknown Scheme')[:name_length],
+                description=item.get('description', ''),
+                benefits=item.get('benefits', ''),
+                eligibility_criteria=item.get('eligibility_criteria', ''),
+                # A cut-off URL is useless, so drop it instead
+                link=link if len(link) <= link_length else ''
+            )
+        )
+
+    # 3. Save all at once to SQL
+    if schemes_to_create:
+        # Schemes the farmer already has are skipped by the unique constraint
+        SchemeRecommendation.objects.bulk_create(schemes_to_create, batch_size=100, ignore_conflicts=True)
+        # bulk_create sends no signals, so clear the cached dashboard here
+        invalidate_dashboard(farmer_id)
+
+
+# A build still pending after this long is treated as dead and may be restarted
+REPORT_LOCK_TIMEOUT = 60 * 2
+
+# Reports bigger than this are spooled to disk while they are written
+REPORT_SPOOL_SIZE = 1024 * 1024
+
+
+def report_lock_key(farmer_id):
+    """Cache key that is set while a credit report is being built for the farmer."""
+    return f"report_lock:{farmer_id}"
+
+
+def _running_report_task(farmer_id):
+    """Task id of a report build for the farmer that is still in progress, if any."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=REPORT_LOCK_TIMEOUT)
+    return CreditReport.objects.filter(
+        farmer_id=farmer_id, status='PENDING', updated_at__gte=cutoff
+    ).values_list('task_id', flat=True).first()
+
+
+def queue_credit_report(farmer_id, base_url=None):
+    """
+    Start building the farmer's credit report in the background and return its task id.
+    
+    Repeat requests while a build is running get that build's task id instead
+    of starting another. The state lives in the CreditReport row so every
+    worker process sees it; the cache lock only closes the gap between the
+    check and the row being written.
+    """
+    running = _running_report_task(farmer_id)
+    if running is None and cache.add(report_lock_key(farmer_id), True, REPORT_LOCK_TIMEOUT):
+        task_id = uuid.uuid4().hex
+        CreditReport.objects.update_or_create(
+            farmer_id=farmer_id, defaults={'task_id': task_id, 'status': 'PENDING'}
+        )
+        run_in_background(credit_report_task, task_id, farmer_id, base_url)
+        return task_id
+    return running or _running_report_task(farmer_id)
+
+
+def credit_report_task(task_id, farmer_id, base_url=None):
+    """Build the report and record where it was stored (or that it failed)."""
+    # Filtering on task_id leaves the row alone if a newer request replaced it
+    report = CreditReport.objects.filter(task_id=task_id)
+    try:
+        name = build_credit_report_pdf(farmer_id, base_url)
+    except Exception:
+        report.update(status='FAILED')
+        raise
+    else:
+        storage = CreditReport._meta.get_field('file').storage
+        previous = report.values_list('file', flat=True).first()
+        if report.update(status='READY', file=name):
+            # Only the latest PDF is kept for each farmer
+            if previous:
+                storage.delete(previous)
+        else:
+            # A newer request replaced this one, so nobody can download it
+            storage.delete(name)
+    finally:
+        cache.delete(report_lock_key(farmer_id))
+
+
+def build_credit_report_pdf(farmer_id, base_url=None):
+    """Render the farmer's credit report into storage and return its storage name."""
+    farmer = FarmerProfile.objects.select_related('user').get(pk=farmer_id)
+    # Random name in private storage: reports are only served by download_report
+    name = f"reports/{farmer.farmer_code}/{uuid.uuid4().hex}.pdf"
+    # WeasyPrint writes straight into a temp file (spilled to disk when large)
+    # that storage then copies in chunks, so the PDF is never held as one bytes object
+    with tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_SIZE) as buffer:
+        render_report_pdf(farmer, buffer, base_url)
+        buffer.seek(0)
+        return CreditReport._meta.get_field('file').storage.save(name, File(buffer))
+
+
+# Stops repeat dashboard loads from starting a second prefetch while one runs
+MANDI_PREFETCH_LOCK_TIMEOUT = 60
+
+
+def mandi_prefetch_key(farmer_id):
+    """Cache key that is set while a mandi price prefetch is running for the farmer."""
+    return f"mandi_prefetch:{farmer_id}"
+
+
+def queue_mandi_prefetch(farmer, crop_names):
+    """Warm the mandi price cache for any of the farmer's crops that aren't cached yet."""
+    missing = uncached_mandi_crops(crop_names, farmer.district, farmer.state)
+    if missing and cache.add(mandi_prefetch_key(farmer.id), True, MANDI_PREFETCH_LOCK_TIMEOUT):
+        run_in_background(prefetch_mandi_for_farmer, farmer.id, missing, farmer.district, farmer.state)
+
+
+def prefetch_mandi_for_farmer(farmer_id, crop_names, district, state):
+    """Fetch (and so cache) mandi prices for the given crops in one parallel batch."""
+    try:
+        fetch_mandi_prices_bulk(crop_names, district, state)
+    finally:
+        cache.delete(mandi_prefetch_key(farmer_id))
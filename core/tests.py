@@ -1,3 +1,199 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .models import CreditReport, CropCycle, Expense, FarmerProfile, SchemeRecommendation, private_storage
+from .signals import dashboard_cache_key
+from .tasks import _store_schemes
+
+
+def make_farmer(username, land='5.00'):
+    user = User.objects.create_user(username=username, password='x')
+    return FarmerProfile.objects.create(user=user, total_land_area=Decimal(land))
+
+
+class CropLandTests(TestCase):
+    def setUp(self):
+        self.farmer = make_farmer('9000000001')
+        self.client.force_login(self.farmer.user)
+
+    def add_crop(self, name, area):
+        return self.client.post(reverse('add_crop'), {
+            'crop_name': name,
+            'area_used': area,
+            'start_date': '2026-06-01',
+        })
+
+    def used_land(self):
+        self.farmer.refresh_from_db()
+        return self.farmer.used_land_area
+
+    def test_crop_add_rejects_more_land_than_is_free(self):
+        self.add_crop('Wheat', '4')
+
+        response = self.add_crop('Rice', '2')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Insufficient Land! Free space: 1.00')
+        self.assertFalse(CropCycle.objects.filter(crop_name='Rice').exists())
+
+    def test_moving_a_cycle_to_another_farmer_checks_their_land(self):
+        self.add_crop('Wheat', '4')
+        other = make_farmer('9000000002')
+        other_cycle = CropCycle.objects.create(farmer=other, crop_name='Rice', area_used=Decimal('4'), start_date='2026-06-01')
+
+        other_cycle.farmer = FarmerProfile.objects.get(pk=self.farmer.pk)
+        with self.assertRaises(ValidationError):
+            other_cycle.clean()
+
+    def test_crop_add_with_bad_area_shows_form_error(self):
+        for area in ('', 'abc'):
+            response = self.add_crop('Wheat', area)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.context['form'].errors['area_used'])
+        self.assertFalse(CropCycle.objects.exists())
+
+    def test_used_land_area_follows_add_harvest_and_delete(self):
+        self.assertRedirects(self.add_crop('Wheat', '2'), reverse('dashboard'), fetch_redirect_response=False)
+        self.add_crop('Rice', '1.5')
+        self.assertEqual(self.used_land(), Decimal('3.50'))
+
+        wheat = CropCycle.objects.get(crop_name='Wheat')
+        self.client.post(reverse('harvest_crop', args=[wheat.id]), {
+            'quantity_produced': '10',
+            'selling_price': '20000',
+            'date_sold': '2026-10-01',
+        })
+        self.assertEqual(self.used_land(), Decimal('1.50'))
+
+        CropCycle.objects.get(crop_name='Rice').delete()
+        self.assertEqual(self.used_land(), Decimal('0.00'))
+
+
+# The real 'dashboard' cache is a DummyCache with the default LocMem backend
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'dashboard': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'dashboard-tests'},
+})
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        self.farmer = make_farmer('9000000001')
+        self.cycle = CropCycle.objects.create(
+            farmer=self.farmer, crop_name='Wheat', area_used=Decimal('2'), start_date='2026-06-01'
+        )
+        self.key = dashboard_cache_key(self.farmer.id)
+        caches['dashboard'].set(self.key, 'cached')
+
+    def assertDashboardCleared(self):
+        self.assertIsNone(caches['dashboard'].get(self.key))
+
+    def test_saving_an_expense_clears_dashboard(self):
+        Expense.objects.create(cycle=self.cycle, item_name='Seeds', cost=Decimal('500'), date='2026-06-02')
+
+        self.assertDashboardCleared()
+
+    def test_harvest_clears_dashboard(self):
+        self.client.force_login(self.farmer.user)
+
+        self.client.post(reverse('harvest_crop', args=[self.cycle.id]), {
+            'quantity_produced': '10',
+            'selling_price': '20000',
+            'date_sold': '2026-10-01',
+        })
+
+        self.assertDashboardCleared()
+
+    def test_storing_schemes_clears_dashboard(self):
+        recommendations = {'recommendations': [{'scheme_name': 'PM-KISAN', 'application_link': 'https://pmkisan.gov.in'}]}
+
+        with mock.patch('core.tasks.fetch_schemes_smartly', return_value=recommendations):
+            _store_schemes(self.farmer.id, self.cycle.id)
+
+        self.assertTrue(SchemeRecommendation.objects.filter(farmer=self.farmer).exists())
+        self.assertDashboardCleared()
+
+
+class CreditReportAccessTests(TestCase):
+    def setUp(self):
+        # Point the private report storage at a scratch directory
+        report_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, report_root, ignore_errors=True)
+        field = CreditReport._meta.get_field('file')
+        self.addCleanup(setattr, field, 'storage', field.storage)
+        field.storage = FileSystemStorage(location=report_root)
+
+        self.owner = make_farmer('9000000001')
+        self.other = make_farmer('9000000002')
+        self.report = CreditReport(farmer=self.owner, task_id='a' * 32, status='READY')
+        self.report.file.save('credit_report.pdf', ContentFile(b'%PDF'))
+
+    def test_owner_can_poll_and_download(self):
+        self.client.force_login(self.owner.user)
+
+        status = self.client.get(reverse('api_report_status', args=[self.report.task_id]))
+        self.assertEqual(status.json()['status'], 'ready')
+
+        download = self.client.get(status.json()['url'])
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(b''.join(download.streaming_content), b'%PDF')
+
+    def test_other_farmer_gets_404(self):
+        self.client.force_login(self.other.user)
+
+        status = self.client.get(reverse('api_report_status', args=[self.report.task_id]))
+        download = self.client.get(reverse('download_report', args=[self.report.task_id]))
+
+        self.assertEqual(status.status_code, 404)
+        self.assertEqual(download.status_code, 404)
+
+    def test_reports_are_not_stored_under_media_root(self):
+        storage = private_storage()
+
+        self.assertFalse(os.path.abspath(storage.location).startswith(os.path.abspath(settings.MEDIA_ROOT)))
+
+    def test_generate_requires_post(self):
+        self.client.force_login(self.owner.user)
+
+        response = self.client.get(reverse('generate_pdf'))
+
+        self.assertEqual(response.status_code, 405)
+
+
+class SignupTests(TestCase):
+    def signup(self, land_area, language='hi', follow=False):
+        return self.client.post(reverse('signup'), {
+            'phone': '9000000001',
+            'name': 'Ram',
+            'password': 'x',
+            'land_area': land_area,
+            'language': language,
+        }, follow=follow)
+
+    def test_bad_land_area_creates_no_user(self):
+        for land_area in ('abc', '-1', 'nan'):
+            response = self.signup(land_area, follow=True)
+
+            self.assertRedirects(response, reverse('login'))
+            self.assertIn('Signup failed', ' '.join(str(m) for m in response.context['messages']))
+        self.assertFalse(User.objects.exists())
+
+    def test_signup_creates_farmer_and_stores_language(self):
+        response = self.signup('2.5')
+
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        farmer = FarmerProfile.objects.get(user__username='9000000001')
+        self.assertEqual(farmer.total_land_area, Decimal('2.50'))
+        self.assertEqual(farmer.language, 'hi')
+        self.assertEqual(self.client.session['django_language'], 'hi')
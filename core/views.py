@@ -3,15 +3,20 @@ from django.contrib.auth import login, authenticate
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
-from django.template.loader import render_to_string
-from django.utils import timezone, translation
-from django.db.models import Sum
-from xhtml2pdf import pisa
-from io import BytesIO
-from .models import CropCycle, Expense, FarmerProfile, Yield, SchemeRecommendation
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils import translation
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import conditional_page, require_POST
+from .models import CreditReport, CropCycle, Expense, FarmerProfile, SchemeRecommendation
 from .forms import CropForm, ExpenseForm, YieldForm
-from .gemini_service import fetch_schemes_smartly
+from .middleware import LANGUAGE_SESSION_KEY
+from .signals import DASHBOARD_CACHE_TIMEOUT, dashboard_cache_key
+from .tasks import queue_credit_report, queue_mandi_prefetch, queue_scheme_fetch, schemes_pending_key
 from .market_service import fetch_mandi_prices, get_crop_forecast
 
 def signup(request):
@@ -33,31 +38,40 @@ def signup(request):
             messages.error(request, "Phone number already registered.")
             return redirect('login')
 
+        # Check the land area the way the model column will (this rejects
+        # text, nan/inf and values too big for it) before creating anything
         try:
-            # Create User
-            user = User.objects.create_user(username=phone, password=password, first_name=name)
-            
-            # Create Farmer Profile with all details
-            FarmerProfile.objects.create(
-                user=user,
-                total_land_area=float(land_area),
-                state=state,
-                district=district,
-                category=category,
-                has_kcc=has_kcc,
-                language=language,
-            )
+            land_area = FarmerProfile._meta.get_field('total_land_area').clean(land_area, None)
+        except ValidationError:
+            land_area = None
+        if land_area is None or land_area < 0:
+            messages.error(request, "Signup failed: please enter a valid land area.")
+            return redirect('login')
+
+        try:
+            # User and profile are created together or not at all
+            with transaction.atomic():
+                # Create User
+                user = User.objects.create_user(username=phone, password=password, first_name=name)
+                
+                # Create Farmer Profile with all details
+                FarmerProfile.objects.create(
+                    user=user,
+                    total_land_area=land_area,
+                    state=state,
+                    district=district,
+                    category=category,
+                    has_kcc=has_kcc,
+                    language=language,
+                )
             
-            # Login
+            # Login (also stores the farmer's language in the session)
             login(request, user)
             
-            # Activate user's language
-            translation.activate(language)
-            request.session['django_language'] = language
-            
             messages.success(request, f"Welcome, {name}!")
             return redirect('dashboard')
-        except Exception as e:
+        except (DatabaseError, ValueError) as e:
+            # Bad form values or a duplicate phone that slipped past the check above
             messages.error(request, f"Signup failed: {e}")
             return redirect('login')
 
@@ -72,20 +86,29 @@ def dashboard(request):
     except:
         return render(request, 'core/error.html', {'message': 'No Farmer Profile Found. Please contact Admin.'})
     
-    # Activate user's preferred language
-    lang = farmer.language or 'en'
-    translation.activate(lang)
-    request.session['django_language'] = lang
-    # Get Data
-    active_crops = CropCycle.objects.filter(farmer=farmer, status='ACTIVE')
-    recent_expenses = Expense.objects.filter(cycle__farmer=farmer).order_by('-date')[:5]
-    recommended_schemes = SchemeRecommendation.objects.filter(farmer=farmer, is_active=True).order_by('-created_at')[:5]
+    # Get Data (cached per farmer when the cache is shared; signals clear it when any of it changes)
+    def load_dashboard_data():
+        return {
+            # Only the columns the dashboard shows (skips notes and the like)
+            'active_crops': list(
+                CropCycle.objects.filter(farmer=farmer, status='ACTIVE').only('crop_name', 'area_used', 'start_date')
+            ),
+            'expenses': list(
+                Expense.objects.filter(cycle__farmer=farmer).only('item_name', 'cost', 'date', 'receipt_image').order_by('-date')[:5]
+            ),
+            'recommended_schemes': list(SchemeRecommendation.objects.filter(farmer=farmer, is_active=True).order_by('-created_at')[:5]),
+        }
+    data = caches['dashboard'].get_or_set(dashboard_cache_key(farmer.id), load_dashboard_data, DASHBOARD_CACHE_TIMEOUT)
+    
+    # Warm mandi prices for the active crops so their harvest pages open instantly
+    queue_mandi_prefetch(farmer, [crop.crop_name for crop in data['active_crops']])
     
     context = {
         'farmer': farmer,
-        'active_crops': active_crops,
-        'expenses': recent_expenses,
-        'recommended_schemes': recommended_schemes,
+        'active_crops': data['active_crops'],
+        'expenses': data['expenses'],
+        'recommended_schemes': data['recommended_schemes'],
+        'schemes_pending': cache.get(schemes_pending_key(farmer.id), False),
         'free_land': farmer.get_free_land()
     }
     return render(request, 'core/dashboard.html', context)
@@ -94,44 +117,16 @@ def dashboard(request):
 @login_required
 def crop_add(request):
     if request.method == 'POST':
-        form = CropForm(request.POST)
+        # Farmer is set up front so the form's validation runs the land check
+        form = CropForm(request.POST, instance=CropCycle(farmer=request.user.farmerprofile))
         if form.is_valid():
             try:
-                crop = form.save(commit=False)
-                crop.farmer = request.user.farmerprofile
-                crop.save()
+                crop = form.save()
                 
                 # --- GEMINI INTEGRATION: Fetch Government Schemes ---
-                try:
-                    # 1. Fetch clean data using structured schema
-                    data = fetch_schemes_smartly(crop.farmer, crop)
-                    
-                    # 2. Bulk Create (Much faster than looping and saving one by one)
-                    schemes_to_create = []
-                    
-                    for item in data.get('recommendations', []):
-                        schemes_to_create.append(
-                            SchemeRecommendation(
-                                farmer=crop.farmer,
-                                scheme_name=item.get('scheme_name', 'Unknown Scheme'),
-                                description=item.get('description', ''),
-                                benefits=item.get('benefits', ''),
-                                eligibility_criteria=item.get('eligibility_criteria', ''),
-                                link=item.get('application_link', '')
-                            )
-                        )
-                    
-                    # 3. Save all at once to SQL
-                    if schemes_to_create:
-                        SchemeRecommendation.objects.bulk_create(schemes_to_create)
-                        messages.success(request, f"New season started! Found {len(schemes_to_create)} relevant schemes.")
-                    else:
-                        messages.success(request, "New season started!")
-                    
-                except Exception as e:
-                    # Log error but don't stop the user flow
-                    print(f"Scheme fetch failed: {e}")
-                    messages.success(request, "New season started!")
+                # Runs in the background so the farmer isn't kept waiting on the AI call
+                queue_scheme_fetch(crop.farmer_id, crop.id)
+                messages.success(request, "New season started! Relevant schemes will appear on your dashboard shortly.")
                 
                 return redirect('dashboard')
             except Exception as e:
@@ -156,7 +151,7 @@ def expense_add(request):
 # 4. Harvest Logic (Close Cycle) — with Mandi Price Integration
 @login_required
 def crop_harvest(request, cycle_id):
-    cycle = get_object_or_404(CropCycle, id=cycle_id, farmer__user=request.user)
+    cycle = get_object_or_404(CropCycle.objects.select_related('farmer'), id=cycle_id, farmer__user=request.user)
     farmer = cycle.farmer
     
     if request.method == 'POST':
@@ -169,7 +164,7 @@ def crop_harvest(request, cycle_id):
             
             # Close the Cycle (Free up land)
             cycle.status = 'HARVESTED'
-            cycle.save()
+            cycle.save(update_fields=['status'])
             
             messages.success(request, "Crop harvested and land released!")
             return redirect('dashboard')
@@ -189,69 +184,49 @@ def crop_harvest(request, cycle_id):
 
 # 5. Generate PDF Bank Report
 @login_required
+@require_POST
 def generate_pdf(request):
+    """Start building the bank report; the page polls api_report_status for it."""
     try:
         farmer = request.user.farmerprofile
     except:
         return HttpResponse("No Farmer Profile Found", status=404)
     
-    # Get data for the report
-    crops = CropCycle.objects.filter(farmer=farmer).order_by('-start_date')[:10]
-    expenses = Expense.objects.filter(cycle__farmer=farmer).order_by('-date')[:10]
-    
-    # Calculate financial summary
-    total_income = Yield.objects.filter(cycle__farmer=farmer).aggregate(
-        total=Sum('selling_price')
-    )['total'] or 0
-    
-    total_expenses = Expense.objects.filter(cycle__farmer=farmer).aggregate(
-        total=Sum('cost')
-    )['total'] or 0
-    
-    net_profit = total_income - total_expenses
-    active_crop_count = CropCycle.objects.filter(farmer=farmer, status='ACTIVE').count()
-    
-    # Simple credit score calculation (0-100)
-    # Based on: number of crops, profit, and activity
-    credit_score = min(100, (
-        (crops.count() * 10) +  # 10 points per crop (max 100)
-        (20 if net_profit > 0 else 0) +  # 20 points for positive profit
-        (active_crop_count * 5)  # 5 points per active crop
-    ))
-    
-    context = {
-        'farmer': farmer,
-        'crops': crops,
-        'expenses': expenses,
-        'total_income': total_income,
-        'total_expenses': total_expenses,
-        'net_profit': net_profit,
-        'active_crop_count': active_crop_count,
-        'credit_score': credit_score,
-        'report_date': timezone.now(),
-    }
-    
-    # Render HTML template
-    html_string = render_to_string('core/report_template.html', context)
-    
-    # Generate PDF using xhtml2pdf
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html_string.encode("UTF-8")), result)
-    
-    if pdf.err:
-        return HttpResponse('Error generating PDF', status=500)
-    
-    # Return PDF as response
-    response = HttpResponse(result.getvalue(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="credit_report_{farmer.farmer_code}.pdf"'
+    # The task has no request, so hand it the site root for relative URLs
+    task_id = queue_credit_report(farmer.id, request.build_absolute_uri('/'))
+    if task_id is None:
+        return JsonResponse({'error': 'A report is already being prepared'}, status=409)
+    return JsonResponse({'task_id': task_id}, status=202)
+
+def _get_report(request, task_id):
+    """The logged-in farmer's credit report for `task_id`, or None."""
+    farmer = getattr(request.user, 'farmerprofile', None)
+    if farmer is None:
+        return None
+    return CreditReport.objects.filter(task_id=task_id, farmer=farmer).first()
+
+@login_required
+def download_report(request, task_id):
+    """Serve a finished bank report."""
+    report = _get_report(request, task_id)
+    if report is None or report.status != 'READY':
+        raise Http404("Report not found")
     
-    return response
+    return FileResponse(
+        report.file.open('rb'),
+        as_attachment=True,
+        filename=f"credit_report_{request.user.farmerprofile.farmer_code}.pdf",
+        content_type='application/pdf',
+    )
 
 # ============================================================
 # 6. API ENDPOINTS (for AJAX calls from templates)
 # ============================================================
 
 @login_required
+@gzip_page
+@conditional_page
+@cache_control(private=True, max_age=60 * 30)
 def api_mandi_prices(request):
     """API: Returns mandi prices for a crop as JSON."""
     crop = request.GET.get('crop', '')
@@ -271,6 +246,9 @@ def api_mandi_prices(request):
 
 
 @login_required
+@gzip_page
+@conditional_page
+@cache_control(private=True, max_age=60 * 30)
 def api_crop_forecast(request):
     """API: Returns profitability forecast for a crop as JSON."""
     crop = request.GET.get('crop', '')
@@ -288,6 +266,33 @@ def api_crop_forecast(request):
     return JsonResponse(data)
 
 
+@login_required
+def api_scheme_status(request):
+    """API: Tells the dashboard whether a background scheme fetch is still running."""
+    try:
+        farmer = request.user.farmerprofile
+    except:
+        return JsonResponse({'error': 'No Farmer Profile Found'}, status=404)
+    
+    return JsonResponse({
+        'pending': cache.get(schemes_pending_key(farmer.id), False),
+        'count': SchemeRecommendation.objects.filter(farmer=farmer, is_active=True).count(),
+    })
+
+
+@login_required
+def api_report_status(request, task_id):
+    """API: Tells the dashboard whether a bank report is ready to download."""
+    report = _get_report(request, task_id)
+    if report is None:
+        return JsonResponse({'error': 'Report not found'}, status=404)
+    
+    data = {'status': report.status.lower()}
+    if report.status == 'READY':
+        data['url'] = reverse('download_report', args=[task_id])
+    return JsonResponse(data)
+
+
 @login_required
 def switch_language(request):
     """View to handle language switching from dashboard"""
@@ -297,13 +302,13 @@ def switch_language(request):
         if lang and lang in dict(settings.LANGUAGES).keys():
             # 1. Activate currency language
             translation.activate(lang)
-            # 2. Set session key (critical for Django 5+)
-            request.session['django_language'] = lang
+            # 2. Set session key (read by FarmerLanguageMiddleware)
+            request.session[LANGUAGE_SESSION_KEY] = lang
             # 3. Persist to profile
             try:
                 farmer = request.user.farmerprofile
                 farmer.language = lang
-                farmer.save()
+                farmer.save(update_fields=['language'])
             except:
                 pass
     